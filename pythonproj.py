@@ -1,21 +1,78 @@
 import asyncio
+import heapq
+import itertools
 import random
-import threading
-import queue
-import json
+import time
+
+import orjson
+from array import array
 from abc import ABC, abstractmethod
 from datetime import datetime
-from functools import reduce 
+
+class _RandBuffer:
+    #uniform values refilled in bulk, cheaper than one random.uniform call per tick
+    __slots__ = ("_lo", "_hi", "_size", "_buf", "_i")
+
+    def __init__(self, lo, hi, size=4096):
+        self._lo = lo
+        self._hi = hi
+        self._size = size
+        self._buf = []
+        self._i = 0
+
+    def next(self):
+        if self._i >= len(self._buf):
+            uniform = random.uniform
+            lo, hi = self._lo, self._hi
+            self._buf = [uniform(lo, hi) for _ in range(self._size)]
+            self._i = 0
+        value = self._buf[self._i]
+        self._i += 1
+        return value
+
+
+#shared jitter for the device loops sleep
+_sleep_jitter = _RandBuffer(2, 4)
+
+#global tick counter for the throttled progress indicator
+_tick = itertools.count(1)
+
+
+#shared timestamp, refreshed by a ticker task instead of per update
+_ts = datetime.now().isoformat()
+
+async def _ts_ticker():
+    #every update in a 100ms window shares the same formatted timestamp
+    global _ts
+    while True:
+        _ts = datetime.now().isoformat()
+        await asyncio.sleep(0.1)
+
 
 #here is the oop layer, the devices
 class SmartDevice(ABC):
+    #slots instead of per-instance dicts, matters with many simulated devices
+    __slots__ = ("device_id", "name", "location", "device_type",
+                 "is_connected", "_base", "_cache", "_cache_ts")
+
+    STATUS_TTL = 1.0  #seconds a cached status snapshot stays fresh
+
     def __init__(self, device_id, name, location):
         self.device_id = device_id
         self.name = name
         self.location = location
         self.device_type = "GENERIC"
         self.is_connected = False
-    
+        #the constant part of every update, built once instead of per tick
+        self._base = {
+            "device_id": device_id,
+            "name": name,
+            "location": location,
+            "device_type": self.device_type
+        }
+        self._cache = None
+        self._cache_ts = 0.0
+
     async def connect(self):
         #the devices conected with delay
         print(f"{self.name} -> connecting...")
@@ -24,16 +81,30 @@ class SmartDevice(ABC):
         self.is_connected = True
         print(f"{self.name} was connected successfully in {delay:.2f}s.")
     
-    async def send_update(self):
-        return {
-            "device_id": self.device_id,
-            "name": self.name,
-            "location": self.location,
-            "device_type": self.device_type,
-            "timestamp": datetime.now().isoformat(),
-            **self._get_status()
-        }
-    
+    def send_update(self):
+        #pure in-memory work, no reason to pay for a coroutine here
+        #a snapshot within the TTL is reused, commands invalidate it
+        now = time.monotonic()
+        if self._cache is not None and now - self._cache_ts < self.STATUS_TTL:
+            update = self._cache.copy()
+            update["timestamp"] = _ts
+            return update
+        update = self._base.copy()
+        update["timestamp"] = _ts
+        update.update(self._get_status())
+        self._cache = update
+        self._cache_ts = now
+        return update
+
+    def check_alerts(self, update):
+        #most devices have nothing to alert on
+        pass
+
+    @staticmethod
+    def _clamp_pct(value):
+        #0..100 clamp with builtin min/max instead of three python branches
+        return max(0, min(100, value))
+
     @abstractmethod
     def _get_status(self):
         pass
@@ -44,9 +115,12 @@ class SmartDevice(ABC):
 
 
 class SmartBulb(SmartDevice):
+    __slots__ = ("is_on", "_brightness")
+
     def __init__(self, device_id, name, location):
         super().__init__(device_id, name, location)
         self.device_type = "BULB"
+        self._base["device_type"] = self.device_type
         self.is_on = False
         self._brightness = 0
     
@@ -56,17 +130,13 @@ class SmartBulb(SmartDevice):
     
     @brightness.setter
     def brightness(self, value):
-        if value < 0:
-            self._brightness = 0
-        elif value > 100:
-            self._brightness = 100
-        else:
-            self._brightness = value
+        self._brightness = self._clamp_pct(value)
     
     def _get_status(self):
         return {"is_on": self.is_on, "brightness": self.brightness}
     
     def execute_command(self, command, **kwargs):
+        self._cache = None
         if command == "turn_on":
             self.is_on = True
             self.brightness = kwargs.get("brightness", 100)
@@ -74,22 +144,32 @@ class SmartBulb(SmartDevice):
 
 
 class SmartThermostat(SmartDevice):
+    __slots__ = ("current_temp", "target_temp", "humidity", "_drift")
+
     def __init__(self, device_id, name, location):
         super().__init__(device_id, name, location)
         self.device_type = "THERMOSTAT"
+        self._base["device_type"] = self.device_type
         self.current_temp = random.uniform(20, 28)
         self.target_temp = 22.0
         self.humidity = 50.0
-    
+        self._drift = _RandBuffer(-1, 2)
+
     def _get_status(self):
-        self.current_temp += random.uniform(-1, 2)
+        self.current_temp += self._drift.next()
         return {
             "current_temp": round(self.current_temp, 1),
             "target_temp": self.target_temp,
             "humidity": round(self.humidity, 1)
         }
-    
+
+    def check_alerts(self, update):
+        if update['current_temp'] > 30:
+            print(f"\n ALERT: High Temp detected! Triggering cooling...")
+            self.execute_command("cool_down")
+
     def execute_command(self, command, **kwargs):
+        self._cache = None
         if command == "cool_down":
             self.current_temp = 22.0
             self.target_temp = 22.0
@@ -97,12 +177,18 @@ class SmartThermostat(SmartDevice):
 
 
 class SmartCamera(SmartDevice):
+    __slots__ = ("motion_detected", "_battery_level", "last_snapshot",
+                 "_motion_rng", "_drain_rng")
+
     def __init__(self, device_id, name, location):
         super().__init__(device_id, name, location) 
         self.device_type = "CAMERA"
+        self._base["device_type"] = self.device_type
         self.motion_detected = False
         self._battery_level = 100
         self.last_snapshot = None
+        self._motion_rng = _RandBuffer(0.0, 1.0)
+        self._drain_rng = _RandBuffer(5, 12)
     
     @property
     def battery_level(self):
@@ -110,22 +196,17 @@ class SmartCamera(SmartDevice):
     
     @battery_level.setter
     def battery_level(self, value):
-        if value < 0:
-            self._battery_level = 0
-        elif value > 100:
-            self._battery_level = 100
-        else:
-            self._battery_level = value
+        self._battery_level = self._clamp_pct(value)
     
     def _get_status(self):
-        self.motion_detected = random.random() < 0.15
-        
+        self.motion_detected = self._motion_rng.next() < 0.15
+
         #the battery drain to see low battery alerts
-        self.battery_level = self.battery_level - random.uniform(5, 12)
+        self.battery_level = self.battery_level - self._drain_rng.next()
         
         #extra 10% drain when motion is detected
         if self.motion_detected:
-            self.last_snapshot = datetime.now().isoformat()
+            self.last_snapshot = _ts
             self.battery_level = self.battery_level - 10
         
         return {
@@ -133,72 +214,166 @@ class SmartCamera(SmartDevice):
             "battery_level": round(self.battery_level, 1),
             "last_snapshot": self.last_snapshot
         }
-    
+
+    def check_alerts(self, update):
+        if update['motion_detected']:
+            print(f"\n ALERT: Motion detected at {self.location}!")
+        if update['battery_level'] < 10:
+            print(f"\n WARNING: {self.name} battery low ({update['battery_level']}%)")
+
     def execute_command(self, command, **kwargs):
+        self._cache = None
         if command == "snapshot":
-            self.last_snapshot = datetime.now().isoformat()
+            self.last_snapshot = _ts
             print(f"{self.device_type} command executed: Snapshot captured.")
 
 
 #network simulation
-async def device_loop(device, data_queue, devices, updates_list):
-    #each device sends updates asynchronously
-    while True:
-        await asyncio.sleep(random.uniform(2, 4))
-        update = await device.send_update()
-        
-        #the small progress indicator
-        print(".", end="", flush=True)
-        
-        #checking for the alerts and printing them
-        if device.device_type == "THERMOSTAT" and update['current_temp'] > 30:
-            print(f"\n ALERT: High Temp detected! Triggering cooling...")
-            device.execute_command("cool_down")
-        
-        if device.device_type == "CAMERA" and update['motion_detected']:
-            print(f"\n ALERT: Motion detected at {device.location}!")
-        
-        if device.device_type == "CAMERA" and update['battery_level'] < 10:
-            print(f"\n WARNING: {device.name} battery low ({update['battery_level']}%)")
-        
-        data_queue.put(update)
-        updates_list.append(update)  #also store for analytics
+#one scheduler task drives every device from a heap of next-fire times
+#instead of keeping a sleeping coroutine alive per device
+
+def _alert_handler(device):
+    #devices that keep the base no-op check (bulbs) get no handler at all
+    if type(device).check_alerts is SmartDevice.check_alerts:
+        return None
+    return device.check_alerts
 
 
 async def run_network(devices, data_queue, updates_list):
-    #here we run all the devices concurrently
-    tasks = [asyncio.create_task(device_loop(d, data_queue, devices, updates_list)) for d in devices]
-    await asyncio.gather(*tasks)
+    jitter = _sleep_jitter.next
+    sleep = asyncio.sleep
+    monotonic = time.monotonic
+    store = updates_list.append
+
+    #seq breaks ties so the heap never compares devices themselves
+    #each entry carries the bound methods so the hot loop resolves nothing
+    heap = [(monotonic() + jitter(), seq, d.send_update, _alert_handler(d))
+            for seq, d in enumerate(devices)]
+    heapq.heapify(heap)
+
+    local_buf = []  #small batch so we put once every few updates
+    while True:
+        fire_at, seq, send_update, check_alerts = heap[0]
+        delay = fire_at - monotonic()
+        if delay > 0:
+            await sleep(delay)
+        heapq.heapreplace(heap, (monotonic() + jitter(), seq, send_update, check_alerts))
+
+        update = send_update()
+
+        #the small progress indicator, only every 100th tick so the hot
+        #path is not paying a stdout flush per update
+        if next(_tick) % 100 == 0:
+            print(".", end="", flush=True)
+
+        if check_alerts is not None:
+            check_alerts(update)
+
+        local_buf.append(update)
+        if len(local_buf) >= 8:
+            await data_queue.put(local_buf)
+            local_buf = []
+        store(update)  #also store for analytics
+
+
+#this is the analytics layer
+_BULB, _THERMOSTAT, _CAMERA = 0, 1, 2
+_DTYPE_CODES = {"BULB": _BULB, "THERMOSTAT": _THERMOSTAT, "CAMERA": _CAMERA}
+
+
+class UpdateWindow:
+    #columnar rolling window: one typed array per analytics field
+    #analytics only reads a few numeric fields, so we store those as
+    #parallel columns instead of keeping the whole dict per record
+    #when the ring wraps, evicted rows spill to disk so analytics still
+    #covers the full run with flat memory
+    def __init__(self, cap=10_000, spill_path="updates.spill"):
+        self.cap = cap
+        self.n = 0       #filled slots, tops out at cap
+        self.total = 0   #every row ever appended, spilled ones included
+        self._next = 0   #ring index
+        self._spill_path = spill_path
+        self._spill = None  #opened lazily on first eviction
+        self.dtype_code = array("b", bytes(cap))
+        self.temps = array("d", [0.0]) * cap
+        self.bright = array("d", [0.0]) * cap
+        self.battery = array("d", [0.0]) * cap
+        self.is_on = array("b", bytes(cap))
+
+    def append(self, update):
+        #only touched from the event loop, so no locking needed
+        i = self._next
+        if self.n == self.cap:
+            #ring is full, spill the row we are about to overwrite
+            if self._spill is None:
+                self._spill = open(self._spill_path, "wb", buffering=1 << 16)
+            self._spill.write(orjson.dumps([
+                self.dtype_code[i], self.temps[i], self.bright[i],
+                self.battery[i], self.is_on[i]
+            ]) + b"\n")
+        self.dtype_code[i] = _DTYPE_CODES[update["device_type"]]
+        self.temps[i] = update.get("current_temp", 0.0)
+        self.bright[i] = update.get("brightness", 0)
+        self.battery[i] = update.get("battery_level", 100)
+        self.is_on[i] = 1 if update.get("is_on") else 0
+        self._next = (i + 1) % self.cap
+        if self.n < self.cap:
+            self.n += 1
+        self.total += 1
+
+    def rows(self):
+        #spilled (oldest) rows first, then the in-memory window
+        if self._spill is not None:
+            self._spill.flush()
+            with open(self._spill_path, "rb") as f:
+                for line in f:
+                    yield orjson.loads(line)
+        dtype_code = self.dtype_code
+        temps = self.temps
+        bright = self.bright
+        battery = self.battery
+        is_on = self.is_on
+        for i in range(self.n):
+            yield dtype_code[i], temps[i], bright[i], battery[i], is_on[i]
+
+    def __len__(self):
+        return self.total
+
+
+def _analytics_kernel(window):
+    #pure numeric reduction, one fused pass over the columns
+    temp_sum = 0.0
+    temp_n = 0
+    total_brightness = 0
+    battery_sum = 0.0
+    battery_n = 0
+    critical = 0
+
+    for code, temp, bright, battery, is_on in window.rows():
+        if code == _THERMOSTAT:
+            temp_sum += temp
+            temp_n += 1
+            if temp > 30:
+                critical += 1
+        elif code == _CAMERA:
+            battery_sum += battery
+            battery_n += 1
+            if battery < 10:
+                critical += 1
+        elif is_on:
+            total_brightness += int(bright)
+
+    avg_temp = temp_sum / temp_n if temp_n else 0
+    avg_battery = battery_sum / battery_n if battery_n else 0
+    return avg_temp, total_brightness, avg_battery, critical
 
 
-#this is the functional layer for analytics
 def process_analytics(updates):
-    #so we map, filter and than reduce
-    #map the extract temperatures
-    temps = list(map(lambda u: u.get('current_temp', 0), 
-        filter(lambda u: u['device_type'] == 'THERMOSTAT', updates)))
-    
-    #filter the critical events
-    critical = list(filter(lambda u: 
-        (u['device_type'] == 'THERMOSTAT' and u.get('current_temp', 0) > 30) or
-        (u['device_type'] == 'CAMERA' and u.get('battery_level', 100) < 10),
-        updates))
-    
-    #reduce the average temperature and total brightness
-    avg_temp = reduce(lambda acc, t: acc + t, temps, 0) / len(temps) if temps else 0
-    
-    brightness_vals = list(map(lambda u: u.get('brightness', 0),
-        filter(lambda u: u['device_type'] == 'BULB' and u.get('is_on'), updates)))
-    total_brightness = reduce(lambda acc, b: acc + b, brightness_vals, 0)
-    
-    #calculate average battery level from cameras
-    battery_vals = list(map(lambda u: u.get('battery_level', 0),
-        filter(lambda u: u['device_type'] == 'CAMERA', updates)))
-    avg_battery = reduce(lambda acc, b: acc + b, battery_vals, 0) / len(battery_vals) if battery_vals else 0
-    
+    #pretty printing wrapper around the numeric kernel
+    avg_temp, total_brightness, avg_battery, critical = _analytics_kernel(updates)
     return {
         "avg_temp": round(avg_temp, 1),
-        "critical_count": len(critical),
+        "critical_count": critical,
         "total_brightness": total_brightness,
         "avg_battery": round(avg_battery, 1),
         "total_updates": len(updates)
@@ -206,28 +381,42 @@ def process_analytics(updates):
 
 
 #storage layer
-def storage_worker(data_queue):
-    #the background thread writes to the disk
-    print("Storage Thread Started...")
-    with open("history.log", "a") as f:
+async def storage_worker(data_queue):
+    #the writer runs on the same event loop now, no cross thread locking
+    print("Storage Task Started...")
+    #64KB buffer so userland->kernel transitions happen per chunk, not per batch
+    with open("history.log", "ab", buffering=1 << 16) as f:
+        last_flush = time.monotonic()
         while True:
+            first = await data_queue.get()
+
+            #drain whatever else is already queued so we do one big write
+            #each queue item is a list of updates from one device
+            batches = [first]
             try:
-                update = data_queue.get(timeout=1)
-                f.write(json.dumps(update) + "\n")
+                while len(batches) < 256:
+                    batches.append(data_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                pass
+
+            f.write(b"".join(orjson.dumps(u) + b"\n" for batch in batches for u in batch))
+
+            #let the buffer do its job, flush on a timer only
+            now = time.monotonic()
+            if now - last_flush >= 5:
                 f.flush()
-            except queue.Empty:
-                continue
+                last_flush = now
 
 
 #main fuction
 async def main():
-    #we create a queue
-    data_queue = queue.Queue()
-    updates = []  #updates for analytics
-    
-    #than starting the storage thread
-    thread = threading.Thread(target=storage_worker, args=(data_queue,), daemon=True)
-    thread.start()
+    #we create a queue, the maxsize makes put block when storage falls behind
+    data_queue = asyncio.Queue(maxsize=1024)
+    updates = UpdateWindow(10_000)  #rolling columnar window for analytics
+
+    #than starting the storage and timestamp tasks on the same loop
+    storage_task = asyncio.create_task(storage_worker(data_queue))
+    ts_task = asyncio.create_task(_ts_ticker())
     print("Connecting devices...")
 
     #create the devices 
@@ -250,13 +439,11 @@ async def main():
         await asyncio.wait_for(run_network(devices, data_queue, updates), timeout=30)
     except asyncio.TimeoutError:
         pass
-    
-    #collect any remaining updates from queue
-    while not data_queue.empty():
-        update = data_queue.get_nowait()
-        if update not in updates:
-            updates.append(update)
-    
+
+    #stop the writer, closing the file flushes whatever is buffered
+    storage_task.cancel()
+    ts_task.cancel()
+
     print("\nANALYTICS SUMMARY\n")
     
     if updates: